@@ -15,55 +15,176 @@ Layout templates are fetched from the storage-info API.
 
 import argparse
 import base64
-import cv2
-import numpy as np
+import functools
+import hashlib
 import json
 import os
 import requests
-import re
 import sys
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+# cv2 and numpy are imported in the functions that use them, so listing layouts
+# and argument errors don't pay for loading OpenCV
 
 # Load environment variables from .env file
 load_dotenv(Path(__file__).parent / ".env")
 
 # ArUco marker settings (must match label-generator)
-ARUCO_DICT = cv2.aruco.DICT_4X4_50
+ARUCO_DICT = "DICT_4X4_50"  # name in cv2.aruco
 MARKER_ID_TL = 1  # Top-left corner marker
 MARKER_ID_BR = 2  # Bottom-right corner marker
 MARKER_ID_TR = 3  # Top-right corner marker
 MARKER_ID_BL = 4  # Bottom-left corner marker
 
+# Marker ID -> (case corner, index of the marker corner that touches it).
+# Marker corners are ordered top-left, top-right, bottom-right, bottom-left.
+_MARKER_MAP = {
+    MARKER_ID_TL: ('tl', 2),  # TL marker is in bottom-right of label
+    MARKER_ID_TR: ('tr', 3),  # TR marker is in bottom-left of label
+    MARKER_ID_BL: ('bl', 1),  # BL marker is in top-right of label
+    MARKER_ID_BR: ('br', 0),  # BR marker is in top-left of label
+}
+
+# Longest image side used for marker detection (larger images are downscaled)
+DETECTION_MAX_SIDE = 1600
+
+# Longest side of the rectified image used for the white label mask (label
+# boxes are mapped back, so OCR still crops from the full rectified image)
+LABEL_DETECTION_MAX_SIDE = 1000
+
+# Images are decoded at a reduced size (1/2, 1/4 or 1/8) as long as their
+# longest side stays at least this many pixels
+DEFAULT_MAX_SIDE = 1500
+
+# Corner refinement half-window in pixels (used by the detector and for the
+# full resolution refinement of the case corners)
+ARUCO_REFINE_WIN_SIZE = 5
+
 # API settings
 DEFAULT_API_URL = "http://localhost:3002"
 
+# OCR settings: "ollama" (vision model over HTTP) or "tesseract" (local, needs tesserocr)
+OCR_BACKEND = os.getenv("OCR_BACKEND", "ollama")
+TESSERACT_LANG = os.getenv("TESSERACT_LANG", "eng")
+TESSERACT_PSM = int(os.getenv("TESSERACT_PSM", "7"))  # 7 = single text line
+
+# Ollama configuration, read once rather than per label
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llava")
+OLLAMA_PROMPT = os.getenv("OLLAMA_PROMPT",
+    "Extract the text from this label image. Return ONLY the text content, nothing else.")
+
+# On-disk cache for API responses (layout templates and drawer sizes rarely change)
+API_CACHE_DIR = Path(os.getenv("XDG_CACHE_HOME", Path.home() / ".cache")) / "drawer-ocr"
+API_CACHE_TTL = int(os.getenv("API_CACHE_TTL", "3600"))  # seconds
+
+# (connect, read) timeouts in seconds: fail fast when a server is down, but
+# give the vision model time to answer
+API_TIMEOUT = (2, 10)
+OLLAMA_TIMEOUT = (2, 30)
+
+# Shared HTTP session so the API and Ollama connections are kept alive
+# across calls instead of opening a new connection per request (sized for
+# the concurrent OCR requests, and never silently retrying)
+SESSION = requests.Session()
+SESSION.mount(
+    OLLAMA_URL,
+    HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=0),
+)
+
+
+def fetch_api_data(api_url, endpoint, use_cache=True):
+    """
+    Fetch data from an API endpoint, caching the response on disk.
+
+    Cached responses younger than API_CACHE_TTL are returned without a request;
+    older ones are revalidated with ETag/Last-Modified so an unchanged catalog
+    only costs a 304. With use_cache=False the cache is ignored but refreshed.
 
-def fetch_layout_templates(api_url):
-    """Fetch all layout templates from the API."""
-    try:
-        response = requests.get(f"{api_url}/api/v1/layout-templates")
+    Raises:
+        requests.RequestException if the API request fails
+    """
+    url = f"{api_url}{endpoint}"
+    cache_path = API_CACHE_DIR / f"{hashlib.sha256(url.encode()).hexdigest()[:16]}.json"
+
+    cached = None
+    if use_cache:
+        try:
+            cached = json.loads(cache_path.read_text())
+        except (OSError, ValueError):
+            cached = None
+        # Treat anything that isn't a well-formed entry as a cache miss
+        if not (
+            isinstance(cached, dict)
+            and 'data' in cached
+            and isinstance(cached.get('fetched_at'), (int, float))
+            and isinstance(cached.get('etag'), (str, type(None)))
+            and isinstance(cached.get('last_modified'), (str, type(None)))
+        ):
+            cached = None
+        if cached and time.time() - cached['fetched_at'] < API_CACHE_TTL:
+            return cached['data']
+
+    headers = {}
+    if cached and cached.get('etag'):
+        headers['If-None-Match'] = cached['etag']
+    if cached and cached.get('last_modified'):
+        headers['If-Modified-Since'] = cached['last_modified']
+
+    response = SESSION.get(url, headers=headers, timeout=API_TIMEOUT)
+    if response.status_code == 304 and cached:
+        data = cached['data']
+        # A 304 may omit the validators, so keep the ones we sent
+        etag = response.headers.get('ETag', cached.get('etag'))
+        last_modified = response.headers.get('Last-Modified', cached.get('last_modified'))
+    else:
         response.raise_for_status()
         result = response.json()
         # API returns {"success": true, "data": [...]}
         if isinstance(result, dict) and 'data' in result:
-            return result['data']
-        return result
+            data = result['data']
+        else:
+            data = result
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+
+    # Failing to write the cache is not fatal, the data is still good
+    try:
+        API_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(f'.{os.getpid()}.tmp')
+        tmp_path.write_text(json.dumps({
+            'url': url,
+            'fetched_at': time.time(),
+            'etag': etag,
+            'last_modified': last_modified,
+            'data': data,
+        }))
+        tmp_path.replace(cache_path)
+    except OSError:
+        pass
+
+    return data
+
+
+def fetch_layout_templates(api_url, use_cache=True):
+    """Fetch all layout templates from the API."""
+    try:
+        return fetch_api_data(api_url, "/api/v1/layout-templates", use_cache)
     except requests.RequestException as e:
         print(f"Error fetching layout templates: {e}")
         return None
 
 
-def fetch_drawer_sizes(api_url):
+def fetch_drawer_sizes(api_url, use_cache=True):
     """Fetch all drawer sizes from the API."""
     try:
-        response = requests.get(f'{api_url}/api/v1/drawer-sizes')
-        response.raise_for_status()
-        result = response.json()
-        # API returns {'success': true, 'data': [...]}
-        if isinstance(result, dict) and 'data' in result:
-            return result['data']
-        return result
+        return fetch_api_data(api_url, '/api/v1/drawer-sizes', use_cache)
     except requests.RequestException as e:
         print(f'Error fetching drawer sizes: {e}')
         return None
@@ -87,9 +208,12 @@ def list_available_layouts(templates):
     print()
 
 
+@functools.lru_cache(maxsize=1)
 def create_aruco_detector():
-    """Create an ArUco detector with tuned parameters."""
-    aruco_dict = cv2.aruco.getPredefinedDictionary(ARUCO_DICT)
+    """Create an ArUco detector with tuned parameters (built once and reused)."""
+    import cv2
+
+    aruco_dict = cv2.aruco.getPredefinedDictionary(getattr(cv2.aruco, ARUCO_DICT))
     parameters = cv2.aruco.DetectorParameters()
 
     # Tune detection parameters for better marker detection
@@ -102,12 +226,16 @@ def create_aruco_detector():
     parameters.minMarkerPerimeterRate = 0.01
     parameters.maxMarkerPerimeterRate = 4.0
 
+    # Our markers never nest or sit close together; pin the minimum distance
+    # between candidates rather than relying on the OpenCV version's default
+    parameters.minMarkerDistanceRate = 0.125
+
     # Allow more variation in marker shape (helps with perspective)
     parameters.polygonalApproxAccuracyRate = 0.08
 
     # Enable corner refinement for better accuracy
     parameters.cornerRefinementMethod = cv2.aruco.CORNER_REFINE_SUBPIX
-    parameters.cornerRefinementWinSize = 5
+    parameters.cornerRefinementWinSize = ARUCO_REFINE_WIN_SIZE
     parameters.cornerRefinementMaxIterations = 30
 
     # Be more lenient with bit extraction
@@ -117,7 +245,23 @@ def create_aruco_detector():
     return cv2.aruco.ArucoDetector(aruco_dict, parameters)
 
 
-def find_aruco_markers(img):
+@functools.lru_cache(maxsize=1)
+def create_clahe():
+    """Create the CLAHE filter used by the marker detection fallbacks (built once)."""
+    import cv2
+
+    return cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+
+
+@functools.lru_cache(maxsize=None)
+def create_rect_kernel(size):
+    """Create a size x size rectangular structuring element (built once per size)."""
+    import cv2
+
+    return cv2.getStructuringElement(cv2.MORPH_RECT, (size, size))
+
+
+def find_aruco_markers(img, verbose=False):
     """
     Detect all four ArUco markers and return the corner points.
 
@@ -128,57 +272,60 @@ def find_aruco_markers(img):
     - BR marker (ID 2): top-left of label -> use top-left corner of marker
 
     Returns:
-        dict with 'tl', 'tr', 'bl', 'br' corner points, or None if markers not found
+        (4, 2) float32 array of the case corners in tl, tr, br, bl order, or
+        None if markers not found
     """
+    import cv2
+    import numpy as np
+
     detector = create_aruco_detector()
 
-    # Try detection with multiple preprocessing approaches
+    # Marker detection saturates well below camera resolution, so detect on a
+    # downscaled copy (long edge at most DETECTION_MAX_SIDE) and map back
+    height, width = img.shape[:2]
+    scale = min(1.0, DETECTION_MAX_SIDE / max(height, width))
+    if scale < 1.0:
+        small = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    else:
+        small = img
+
+    # Try detection with multiple preprocessing approaches, in order of cost.
+    # Each entry is (description, preprocessing function).
+    def clahe_enhanced():
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        enhanced = create_clahe().apply(gray)
+        return cv2.cvtColor(enhanced, cv2.COLOR_GRAY2BGR)
+
+    def sharpened():
+        # Unsharp mask: boost edges by subtracting a Gaussian-blurred copy
+        blurred = cv2.GaussianBlur(small, (0, 0), 1.0)
+        return cv2.addWeighted(small, 1.5, blurred, -0.5, 0)
+
+    approaches = [
+        ("Original image", lambda: small),
+        ("CLAHE enhanced", clahe_enhanced),
+        ("Sharpened", sharpened),
+    ]
+    required_ids = {MARKER_ID_TL, MARKER_ID_TR, MARKER_ID_BL, MARKER_ID_BR}
+
     all_corners = []
     all_ids = []
 
-    # Approach 1: Original image
-    corners, ids, _ = detector.detectMarkers(img)
-    if ids is not None:
-        all_corners.extend(corners)
-        all_ids.extend(ids.flatten())
-        print(f"  Original image: found {ids.flatten().tolist()}")
-
-    # Approach 2: Enhanced contrast (CLAHE)
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-    enhanced = clahe.apply(gray)
-    enhanced_bgr = cv2.cvtColor(enhanced, cv2.COLOR_GRAY2BGR)
-    corners2, ids2, _ = detector.detectMarkers(enhanced_bgr)
-    if ids2 is not None:
-        for i, mid in enumerate(ids2.flatten()):
-            if mid not in all_ids:
-                all_corners.append(corners2[i])
-                all_ids.append(mid)
-        print(f"  CLAHE enhanced: found {ids2.flatten().tolist()}")
-
-    # Approach 3: Sharpened image
-    kernel = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]])
-    sharpened = cv2.filter2D(img, -1, kernel)
-    corners3, ids3, _ = detector.detectMarkers(sharpened)
-    if ids3 is not None:
-        for i, mid in enumerate(ids3.flatten()):
-            if mid not in all_ids:
-                all_corners.append(corners3[i])
-                all_ids.append(mid)
-        print(f"  Sharpened: found {ids3.flatten().tolist()}")
-
-    # Approach 4: Scaled up (helps with small markers)
-    scale = 1.5
-    scaled = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
-    corners4, ids4, _ = detector.detectMarkers(scaled)
-    if ids4 is not None:
-        for i, mid in enumerate(ids4.flatten()):
-            if mid not in all_ids:
-                # Scale corners back to original image coordinates
-                scaled_corners = corners4[i] / scale
-                all_corners.append(scaled_corners)
-                all_ids.append(mid)
-        print(f"  Scaled up 1.5x: found {ids4.flatten().tolist()}")
+    for name, preprocess in approaches:
+        corners, ids, _ = detector.detectMarkers(preprocess())
+        if ids is not None:
+            for i, mid in enumerate(ids.flatten()):
+                if mid not in all_ids:
+                    # Scale corners back to original image coordinates
+                    # (pixel centers, hence the half-pixel offsets)
+                    all_corners.append((corners[i] + 0.5) / scale - 0.5)
+                    all_ids.append(mid)
+            if verbose:
+                print(f"  {name}: found {ids.flatten().tolist()}")
+
+        # Skip the remaining (more expensive) approaches once all four are found
+        if required_ids.issubset(all_ids):
+            break
 
     if not all_ids:
         print("No ArUco markers detected")
@@ -195,28 +342,20 @@ def find_aruco_markers(img):
     print(f"Detected ArUco markers: {ids.flatten().tolist()}")
 
     found_corners = {}
+    marker_sides = {}
 
-    for i, marker_id in enumerate(ids.flatten()):
-        # corners[i][0] contains the 4 corners of the marker in order:
-        # [top-left, top-right, bottom-right, bottom-left]
+    for i, marker_id in enumerate(ids.flat):
+        info = _MARKER_MAP.get(int(marker_id))
+        if info is None:
+            continue
+        key, corner_idx = info
+        # corners[i][0] contains the 4 corners of the marker
         marker_corners = corners[i][0]
-
-        if marker_id == MARKER_ID_TL:
-            # TL marker is in bottom-right of label, use its bottom-right corner
-            found_corners['tl'] = marker_corners[2]  # bottom-right of marker
-            print(f"  TL marker (ID {MARKER_ID_TL}) -> case TL: {found_corners['tl']}")
-        elif marker_id == MARKER_ID_TR:
-            # TR marker is in bottom-left of label, use its bottom-left corner
-            found_corners['tr'] = marker_corners[3]  # bottom-left of marker
-            print(f"  TR marker (ID {MARKER_ID_TR}) -> case TR: {found_corners['tr']}")
-        elif marker_id == MARKER_ID_BL:
-            # BL marker is in top-right of label, use its top-right corner
-            found_corners['bl'] = marker_corners[1]  # top-right of marker
-            print(f"  BL marker (ID {MARKER_ID_BL}) -> case BL: {found_corners['bl']}")
-        elif marker_id == MARKER_ID_BR:
-            # BR marker is in top-left of label, use its top-left corner
-            found_corners['br'] = marker_corners[0]  # top-left of marker
-            print(f"  BR marker (ID {MARKER_ID_BR}) -> case BR: {found_corners['br']}")
+        found_corners[key] = marker_corners[corner_idx]
+        edges = marker_corners - np.roll(marker_corners, 1, axis=0)
+        marker_sides[key] = np.hypot(edges[:, 0], edges[:, 1]).mean()
+        if verbose:
+            print(f"  {key.upper()} marker (ID {marker_id}) -> case {key.upper()}: {found_corners[key]}")
 
     # Check all four corners were found
     required = ['tl', 'tr', 'bl', 'br']
@@ -227,40 +366,112 @@ def find_aruco_markers(img):
         print(f"Missing markers: {missing_str}")
         return None
 
-    return found_corners
+    # Corners found on the downscaled copy are only accurate to about a pixel
+    # of that copy, so refine the four case corners at full resolution. The
+    # half-window is a fixed full resolution size, capped at a tenth of the
+    # marker side so it stays inside the marker's border cell (a 4x4 marker
+    # is 6 cells across) and the inner bits and white margin can't pull the
+    # corner away.
+    if scale < 1.0:
+        for key, point in found_corners.items():
+            win = min(ARUCO_REFINE_WIN_SIZE, int(marker_sides[key] / 10))
+            found_corners[key] = refine_corner(img, point, win, max_shift=1.0 / scale)
+
+    # Hand the corners over in the order getPerspectiveTransform expects
+    return np.array([found_corners[key] for key in ('tl', 'tr', 'br', 'bl')], dtype=np.float32)
+
+
+def refine_corner(img, point, win, max_shift):
+    """
+    Refine a corner point to sub-pixel accuracy with cv2.cornerSubPix.
+
+    Only a small patch around the point is converted to grayscale, so this is
+    cheap even on full resolution images. The original point is kept if the
+    window is too small to be useful or the refinement moves the point by
+    more than max_shift pixels (more than the point's own uncertainty, so
+    it latched onto a different edge).
+    """
+    import cv2
+    import numpy as np
+
+    if win < 2:
+        return point
+
+    height, width = img.shape[:2]
+    margin = win + 2
+    x0 = max(0, int(point[0]) - margin)
+    y0 = max(0, int(point[1]) - margin)
+    x1 = min(width, int(point[0]) + margin + 1)
+    y1 = min(height, int(point[1]) + margin + 1)
+
+    # Leave points too close to the image edge for a full search window as-is
+    if x1 - x0 < 2 * margin + 1 or y1 - y0 < 2 * margin + 1:
+        return point
+
+    patch = cv2.cvtColor(img[y0:y1, x0:x1], cv2.COLOR_BGR2GRAY)
+    local = np.array([[point[0] - x0, point[1] - y0]], dtype=np.float32)
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_COUNT, 30, 0.01)
+    cv2.cornerSubPix(patch, local, (win, win), (-1, -1), criteria)
+    refined = local[0] + np.array([x0, y0], dtype=np.float32)
+    if np.hypot(*(refined - point)) > max_shift:
+        return point
+    return refined
+
+
+@functools.lru_cache(maxsize=1)
+def cuda_available():
+    """Return True if OpenCV was built with CUDA and a CUDA device is present."""
+    import cv2
+
+    try:
+        return cv2.cuda.getCudaEnabledDeviceCount() > 0
+    except (AttributeError, cv2.error):
+        return False
+
+
+@functools.lru_cache(maxsize=1)
+def opencl_available():
+    """
+    Return True if OpenCV can run on an OpenCL device (via cv2.UMat).
+
+    Set OCV_DISABLE_UMAT=1 to keep everything on the CPU.
+    """
+    import cv2
+
+    if os.getenv("OCV_DISABLE_UMAT") == "1":
+        return False
+    return cv2.ocl.haveOpenCL() and cv2.ocl.useOpenCL()
 
 
-def perspective_transform(img, corners, output_size=None):
+def perspective_transform(img, src_pts, output_size=None, dst=None):
     """
     Apply perspective transform to warp the image to a flat rectangle.
 
     Args:
         img: Input image
-        corners: dict with 'tl', 'tr', 'bl', 'br' corner points
+        src_pts: (4, 2) float32 array of the case corners in tl, tr, br, bl
+            order, as returned by find_aruco_markers
         output_size: (width, height) of output image, or None to auto-calculate
+        dst: Optional preallocated output image to warp (CPU) or download
+            (CUDA) into; it is reused when it already has the right size and
+            type, e.g. by a caller processing a batch, and reallocated otherwise
 
     Returns:
         tuple: (warped_image, case_bounds)
         case_bounds is (0, 0, width, height) since image is now rectified
     """
-    # Source points (the detected corners in the original image)
-    src_pts = np.array([
-        corners['tl'],
-        corners['tr'],
-        corners['br'],
-        corners['bl']
-    ], dtype=np.float32)
+    import cv2
+    import numpy as np
 
     # Calculate output size if not specified
     if output_size is None:
-        # Use the maximum width and height from the quadrilateral
-        width_top = np.linalg.norm(corners['tr'] - corners['tl'])
-        width_bottom = np.linalg.norm(corners['br'] - corners['bl'])
-        height_left = np.linalg.norm(corners['bl'] - corners['tl'])
-        height_right = np.linalg.norm(corners['br'] - corners['tr'])
-
-        width = int(max(width_top, width_bottom))
-        height = int(max(height_left, height_right))
+        # Use the maximum width and height from the quadrilateral; the edge
+        # vectors are top, bottom, left, right
+        edges = src_pts[[1, 2, 3, 2]] - src_pts[[0, 3, 0, 1]]
+        lengths = np.hypot(edges[:, 0], edges[:, 1])
+
+        width = int(max(lengths[0], lengths[1]))
+        height = int(max(lengths[2], lengths[3]))
     else:
         width, height = output_size
 
@@ -272,11 +483,21 @@ def perspective_transform(img, corners, output_size=None):
         [0, height - 1]   # BL
     ], dtype=np.float32)
 
-    # Compute perspective transform matrix
+    # Compute perspective transform matrix (cheap; the corners differ for
+    # every photo, so there is nothing worth caching)
     matrix = cv2.getPerspectiveTransform(src_pts, dst_pts)
 
     # Apply the transform
-    warped = cv2.warpPerspective(img, matrix, (width, height))
+    if cuda_available():
+        # Upload once, warp on the GPU and download only the result
+        gpu_img = cv2.cuda_GpuMat()
+        gpu_img.upload(img)
+        gpu_warped = cv2.cuda.warpPerspective(gpu_img, matrix, (width, height))
+        warped = gpu_warped.download() if dst is None else gpu_warped.download(dst=dst)
+    else:
+        # warpPerspective computes the pixel mapping on the fly, which is
+        # faster than building remap tables for a single use
+        warped = cv2.warpPerspective(img, matrix, (width, height), dst=dst, flags=cv2.INTER_LINEAR)
 
     print(f"Perspective transform: {img.shape[1]}x{img.shape[0]} -> {width}x{height}")
 
@@ -286,58 +507,107 @@ def perspective_transform(img, corners, output_size=None):
     return warped, case_bounds
 
 
-def find_white_labels(img, output_dir):
+def find_white_labels(img, output_dir, debug=False, scale=1.0):
     """
     Find white label rectangles in the image.
     Labels are white rectangles typically at the bottom of each drawer.
+
+    The pixel size thresholds are tuned for full resolution photos; scale is
+    the factor the image was loaded at relative to that (e.g. 0.5).
+
+    Returns:
+        dict of equal-length arrays 'x', 'y', 'w', 'h', 'cx', 'cy' and 'area',
+        one entry per label in img coordinates, sorted top to bottom then left
+        to right
     """
+    import cv2
+    import numpy as np
+
+    # Labels are large, so find them on a downscaled copy (long edge at most
+    # LABEL_DETECTION_MAX_SIDE) and map the boxes back afterwards
+    full_height, full_width = img.shape[:2]
+    mask_scale = min(1.0, LABEL_DETECTION_MAX_SIDE / max(full_height, full_width))
+    if mask_scale < 1.0:
+        img = cv2.resize(img, None, fx=mask_scale, fy=mask_scale, interpolation=cv2.INTER_AREA)
+        scale *= mask_scale
     height, width = img.shape[:2]
 
-    # Convert to HSV for better color detection
-    hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
-
-    # White has low saturation and high value
-    lower_white = np.array([0, 0, 180])
-    upper_white = np.array([180, 40, 255])
-
-    white_mask = cv2.inRange(hsv, lower_white, upper_white)
-    cv2.imwrite(str(output_dir / 'debug_mask_1.png'), white_mask)
-
-    # Clean up the mask
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (7, 7))
-    white_mask = cv2.morphologyEx(white_mask, cv2.MORPH_OPEN, kernel)
-    cv2.imwrite(str(output_dir / 'debug_mask_2.png'), white_mask)
-
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (11, 11))
-    white_mask = cv2.morphologyEx(white_mask, cv2.MORPH_CLOSE, kernel)
-    cv2.imwrite(str(output_dir / 'debug_mask_3.png'), white_mask)
-
-    # Find contours of white regions
-    contours, _ = cv2.findContours(white_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-    labels = []
-    for contour in contours:
-        x, y, w, h = cv2.boundingRect(contour)
-        area = cv2.contourArea(contour)
-
-        # Filter by size and aspect ratio (labels are wider than tall)
-        # Also filter out labels at very top/bottom edge (false positives from markers)
-        if (w > 100 and h > 20 and h < 150 and w/h > 2 and area > 3000
-            and y > 50 and y < height - 100):  # Not at top/bottom edge
-            labels.append({
-                'x': x,
-                'y': y,
-                'w': w,
-                'h': h,
-                'cx': x + w/2,  # center x
-                'cy': y + h/2,  # center y
-                'area': area
-            })
+    # The mask building and cleanup are plain per-pixel work, so run them on
+    # the GPU through OpenCL when there is one (UMat falls back transparently)
+    src = cv2.UMat(img) if opencl_available() else img
+
+    # White paper is bright and unsaturated: a high channel maximum (HSV
+    # value) plus a small spread between the channels (a cheap stand-in for
+    # HSV saturation), all computed straight from BGR. Intermediates are
+    # written in place, and the channel planes are reused once consumed, so
+    # only two extra planes are allocated.
+    b, g, r = cv2.split(src)
+    value = cv2.max(b, g)
+    cv2.max(value, r, dst=value)
+    spread = cv2.min(b, g)
+    cv2.min(spread, r, dst=spread)
+    cv2.subtract(value, spread, dst=spread)
+    white_mask = cv2.compare(value, 180, cv2.CMP_GE, dst=b)
+    cv2.bitwise_and(white_mask, cv2.compare(spread, 40, cv2.CMP_LT, dst=g), dst=white_mask)
+    if debug:
+        cv2.imwrite(str(output_dir / 'debug_mask_1.png'), white_mask)
+
+    # Clean up the mask (small specks are rejected by the size filter below).
+    # OpenCV already runs rectangular kernels as separate row and column
+    # passes, so a single close, written back into the mask, is enough
+    kernel_size = int(11 * scale) | 1
+    cv2.morphologyEx(white_mask, cv2.MORPH_CLOSE, create_rect_kernel(kernel_size), dst=white_mask)
+    if debug:
+        cv2.imwrite(str(output_dir / 'debug_mask_2.png'), white_mask)
+    if isinstance(white_mask, cv2.UMat):
+        white_mask = white_mask.get()
+
+    # Find white regions; the stats give bounding boxes and pixel areas as
+    # columns so they can be filtered in one go (row 0 is the background)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(white_mask, connectivity=8, ltype=cv2.CV_32S)
+    stats = stats[1:]
+    x = stats[:, cv2.CC_STAT_LEFT]
+    y = stats[:, cv2.CC_STAT_TOP]
+    w = stats[:, cv2.CC_STAT_WIDTH]
+    h = stats[:, cv2.CC_STAT_HEIGHT]
+    areas = stats[:, cv2.CC_STAT_AREA].astype(np.float64)
+
+    # Filter by size and aspect ratio (labels are wider than tall)
+    # Also filter out labels at very top/bottom edge (false positives from markers)
+    keep = (
+        (w > 100 * scale) & (h > 20 * scale) & (h < 150 * scale) & (w / h > 2)
+        & (areas > 3000 * scale * scale)
+        & (y > 50 * scale) & (y < height - 100 * scale)  # Not at top/bottom edge
+    )
 
     # Sort by position (top to bottom, left to right)
-    labels.sort(key=lambda l: (l['y'], l['x']))
+    idx = np.flatnonzero(keep)
+    idx = idx[np.lexsort((x[idx], y[idx]))]
+
+    # Map the kept boxes back to the input image (per axis, since the resize
+    # rounds each side separately)
+    if mask_scale < 1.0:
+        fx = full_width / width
+        fy = full_height / height
+        right = np.round((x + w) * fx).astype(x.dtype)
+        bottom = np.round((y + h) * fy).astype(y.dtype)
+        x = np.round(x * fx).astype(x.dtype)
+        y = np.round(y * fy).astype(y.dtype)
+        w = right - x
+        h = bottom - y
+        areas = areas * (fx * fy)
+
+    labels = {
+        'x': x[idx],
+        'y': y[idx],
+        'w': w[idx],
+        'h': h[idx],
+        'cx': x[idx] + w[idx] / 2,  # center x
+        'cy': y[idx] + h[idx] / 2,  # center y
+        'area': areas[idx],
+    }
 
-    print(f"Found {len(labels)} potential labels")
+    print(f"Found {len(idx)} potential labels")
     return labels
 
 
@@ -345,14 +615,23 @@ def assign_labels_to_grid(labels, case_bounds, layout, drawer_sizes):
     """
     Assign detected labels to drawer positions based on their coordinates.
     Uses case_bounds from ArUco marker detection and layout template for variable drawer sizes.
+
+    Returns:
+        tuple: (label_grid, grid_info)
+        label_grid is a (rows, columns) int array holding the index into labels
+        of the label assigned to the drawer at (row, col) (1-indexed, so at
+        label_grid[row - 1, col - 1]), or -1 where there is none
     """
-    if not labels:
-        return {}, None
+    import numpy as np
 
     grid_cols = layout['columns']
     grid_rows = layout['rows']
     layout_data = layout.get('layoutData', [])
 
+    label_grid = np.full((grid_rows, grid_cols), -1, dtype=np.intp)
+    if len(labels['x']) == 0:
+        return label_grid, None
+
     # Create mapping of size names to dimensions
     size_map = {size['name']: size for size in drawer_sizes}
 
@@ -370,15 +649,21 @@ def assign_labels_to_grid(labels, case_bounds, layout, drawer_sizes):
     print(f'Grid: {grid_cols} cols x {grid_rows} rows')
     print(f'Base unit size: {unit_width:.1f} x {unit_height:.1f}')
 
-    # Build drawer boundary map for variable-sized drawers
-    drawer_boundaries = {}
-    valid_positions = set()
-
+    # Resolve drawer positions and sizes (in grid units) in a single pass
+    positions = []
+    drawer_units = []
     for drawer in layout_data:
         row = drawer['row']
         col = drawer['col']
         size_name = drawer['size']
 
+        if not (1 <= row <= grid_rows and 1 <= col <= grid_cols):
+            print(
+                f"Warning: Drawer position ({row}, {col}) is outside the "
+                f"{grid_rows}x{grid_cols} grid"
+            )
+            continue
+
         # Get drawer dimensions in grid units
         size_info = size_map.get(size_name)
         if not size_info:
@@ -387,66 +672,54 @@ def assign_labels_to_grid(labels, case_bounds, layout, drawer_sizes):
             )
             continue
 
-        width_units = size_info['widthUnits']
-        height_units = size_info['heightUnits']
-
-        # Calculate pixel boundaries for this drawer
-        # Convert from 1-indexed layout coords to 0-indexed pixel coords
-        left = grid_left + (col - 1) * unit_width
-        top = grid_top + (row - 1) * unit_height
-        right = left + width_units * unit_width
-        bottom = top + height_units * unit_height
-
-        drawer_boundaries[(row, col)] = {
-            'left': left,
-            'top': top,
-            'right': right,
-            'bottom': bottom,
-            'width': right - left,
-            'height': bottom - top,
-            'center_x': (left + right) / 2,
-            'center_y': (top + bottom) / 2,
-        }
-        valid_positions.add((row, col))
+        positions.append((row, col))
+        drawer_units.append((row, col, size_info['widthUnits'], size_info['heightUnits']))
+
+    print(f'Layout has {len(positions)} drawer positions with variable sizes')
 
-    print(f'Layout has {len(valid_positions)} drawer positions with variable sizes')
+    # Calculate pixel boundaries for all drawers at once
+    # Convert from 1-indexed layout coords to 0-indexed pixel coords
+    rows, cols, width_units, height_units = np.array(drawer_units, dtype=np.float64).reshape(-1, 4).T
+    lefts = grid_left + (cols - 1) * unit_width
+    tops = grid_top + (rows - 1) * unit_height
+    rights = lefts + width_units * unit_width
+    bottoms = tops + height_units * unit_height
+    centers_x = (lefts + rights) / 2
+    centers_y = (tops + bottoms) / 2
 
     # Assign each label to the closest drawer based on distance to center
-    grid_labels = {}
-    for label in labels:
+    if positions:
         # Use center of label
-        cx = label['cx']
-        cy = label['cy']
-
-        # Find the drawer whose center is closest to this label
-        best_position = None
-        min_distance = float('inf')
-
-        for (row, col), bounds in drawer_boundaries.items():
-            # Calculate distance from label center to drawer center
-            dx = cx - bounds['center_x']
-            dy = cy - bounds['center_y']
-            distance = dx * dx + dy * dy  # Squared distance (no need for sqrt)
-
-            if distance < min_distance:
-                min_distance = distance
-                best_position = (row, col)
-
-        # Check if label is reasonably close to the best drawer (within drawer bounds)
-        if best_position:
-            bounds = drawer_boundaries[best_position]
-            # Check if label center is within or very close to drawer bounds
-            margin = max(bounds['width'], bounds['height']) * 0.3  # 30% margin
-            if (
-                bounds['left'] - margin <= cx <= bounds['right'] + margin
-                and bounds['top'] - margin <= cy <= bounds['bottom'] + margin
-            ):
-                # Keep the label with the largest area for each position
-                if (
-                    best_position not in grid_labels
-                    or label['area'] > grid_labels[best_position]['area']
-                ):
-                    grid_labels[best_position] = label
+        label_cx = labels['cx']
+        label_cy = labels['cy']
+        label_area = labels['area']
+
+        # Squared distance from every label center to every drawer center
+        # (no need for sqrt), then the closest drawer for each label
+        distances = (
+            (label_cx[:, None] - centers_x) ** 2
+            + (label_cy[:, None] - centers_y) ** 2
+        )
+        best = distances.argmin(axis=1)
+
+        # Check if label center is within or very close to drawer bounds
+        margin = np.maximum(rights - lefts, bottoms - tops)[best] * 0.3  # 30% margin
+        in_bounds = (
+            (lefts[best] - margin <= label_cx) & (label_cx <= rights[best] + margin)
+            & (tops[best] - margin <= label_cy) & (label_cy <= bottoms[best] + margin)
+        )
+
+        # Keep the label with the largest area for each position (the first
+        # one on ties): sort candidates by drawer, then area descending, then
+        # label order, and take the first entry of each drawer's run
+        candidates = np.flatnonzero(in_bounds)
+        candidates = candidates[np.lexsort(
+            (candidates, -label_area[candidates], best[candidates])
+        )]
+        _, first = np.unique(best[candidates], return_index=True)
+        winners = candidates[first]
+        winner_rows, winner_cols = np.array(positions)[best[winners]].T
+        label_grid[winner_rows - 1, winner_cols - 1] = winners
 
     grid_info = {
         'left': grid_left,
@@ -457,17 +730,91 @@ def assign_labels_to_grid(labels, case_bounds, layout, drawer_sizes):
         'unit_height': unit_height,
         'columns': grid_cols,
         'rows': grid_rows,
-        'drawer_boundaries': drawer_boundaries,
+        'positions': positions,
+        # One (left, top, right, bottom) row per entry in positions
+        'drawer_bounds': np.column_stack((lefts, tops, rights, bottoms)),
     }
 
-    return grid_labels, grid_info
+    return label_grid, grid_info
+
+
+def ocr_with_ollama(label_img):
+    """Run OCR on a label image using the Ollama vision model."""
+    import cv2
+
+    # Encode image as base64 (JPEG keeps color for the vision model and is much
+    # cheaper to encode and send than PNG)
+    _, buffer = cv2.imencode('.jpg', label_img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    img_base64 = base64.b64encode(buffer).decode('ascii')
+
+    # Call Ollama API
+    try:
+        response = SESSION.post(
+            f"{OLLAMA_URL}/api/generate",
+            json={
+                "model": OLLAMA_MODEL,
+                "prompt": OLLAMA_PROMPT,
+                "images": [img_base64],
+                "stream": False
+            },
+            timeout=OLLAMA_TIMEOUT
+        )
+        response.raise_for_status()
+        result = response.json()
+        return result.get("response", "").strip()
+    except Exception as e:
+        print(f"Ollama OCR error: {e}")
+        return ""
+
+
+# One Tesseract engine per OCR worker thread (an engine isn't thread-safe)
+_TESSERACT = threading.local()
 
 
-def extract_and_ocr_label(img, label_info, row, col, output_dir):
+def tesseract_api():
     """
-    Extract the label region and run OCR using Ollama vision model.
+    Return this thread's Tesseract engine, creating it on first use.
+
+    The engine and its traineddata stay loaded for the rest of the run, so
+    each label costs only the recognition itself.
+    """
+    api = getattr(_TESSERACT, 'api', None)
+    if api is None:
+        from tesserocr import PyTessBaseAPI
+
+        api = _TESSERACT.api = PyTessBaseAPI(lang=TESSERACT_LANG, psm=TESSERACT_PSM)
+    return api
+
+
+def ocr_with_tesseract(label_img):
+    """
+    Run OCR on a label image with Tesseract.
+
+    Much faster than a vision model for printed labels, and skips the
+    base64 encoding and HTTP round-trip entirely.
     """
-    x, y, w, h = label_info['x'], label_info['y'], label_info['w'], label_info['h']
+    import cv2
+
+    # Hand the raw 8-bit grayscale pixels straight to Tesseract (no PIL image
+    # or encoded file in between). Tesseract doesn't copy the buffer, so keep
+    # a reference until recognition is done.
+    gray = cv2.cvtColor(label_img, cv2.COLOR_BGR2GRAY)
+    height, width = gray.shape
+    pixels = gray.tobytes()
+    try:
+        api = tesseract_api()
+        api.SetImageBytes(pixels, width, height, 1, width)
+        return api.GetUTF8Text().strip()
+    except Exception as e:
+        print(f"Tesseract OCR error: {e}")
+        return ""
+
+
+def extract_label(img, labels, index, row, col, output_dir, debug=False):
+    """Crop label number index (with a little padding trimmed) out of the image."""
+    import cv2
+
+    x, y, w, h = labels['x'][index], labels['y'][index], labels['w'][index], labels['h'][index]
 
     # Add some padding
     pad = 3
@@ -478,45 +825,28 @@ def extract_and_ocr_label(img, label_info, row, col, output_dir):
 
     label_img = img[y1:y2, x1:x2]
 
-    # Save label image (keep color for vision model)
-    label_path = output_dir / f"label_r{row}_c{col}.png"
-    cv2.imwrite(str(label_path), label_img)
+    # Save label image for debugging
+    if debug:
+        label_path = output_dir / f"label_r{row}_c{col}.png"
+        cv2.imwrite(str(label_path), label_img)
 
-    # Get Ollama configuration from environment
-    ollama_url = os.getenv("OLLAMA_URL", "http://localhost:11434")
-    ollama_model = os.getenv("OLLAMA_MODEL", "llava")
-    ollama_prompt = os.getenv("OLLAMA_PROMPT",
-        "Extract the text from this label image. Return ONLY the text content, nothing else.")
+    return label_img
 
-    # Encode image as base64
-    _, buffer = cv2.imencode('.png', label_img)
-    img_base64 = base64.b64encode(buffer).decode('utf-8')
 
-    # Call Ollama API
-    try:
-        response = requests.post(
-            f"{ollama_url}/api/generate",
-            json={
-                "model": ollama_model,
-                "prompt": ollama_prompt,
-                "images": [img_base64],
-                "stream": False
-            },
-            timeout=30
-        )
-        response.raise_for_status()
-        result = response.json()
-        text = result.get("response", "").strip()
-        return text
-    except Exception as e:
-        print(f"Ollama OCR error: {e}")
-        return ""
+def ocr_label(label_img):
+    """Run OCR on a label image using the configured OCR_BACKEND."""
+    if OCR_BACKEND == "tesseract":
+        return ocr_with_tesseract(label_img)
+    return ocr_with_ollama(label_img)
 
 
-def save_debug_image(img, labels, grid_labels, grid_info, output_path="debug_detection.png"):
+def save_debug_image(img, labels, label_grid, grid_info, output_path="debug_detection.jpg"):
     """
     Save a scaled-down debug image showing detected labels and grid assignments.
     """
+    import cv2
+    import numpy as np
+
     # Scale down for easier viewing
     scale = 0.25
     height, width = img.shape[:2]
@@ -525,20 +855,23 @@ def save_debug_image(img, labels, grid_labels, grid_info, output_path="debug_det
 
     debug_img = cv2.resize(img, (new_width, new_height))
 
+    # Scale box coordinates once up front; the drawing itself has to be done
+    # per box since OpenCV has no batch rectangle API
+    label_boxes = np.column_stack((
+        labels['x'], labels['y'], labels['x'] + labels['w'], labels['y'] + labels['h']
+    ))
+    label_boxes = (label_boxes * scale).astype(np.int32)
+
+    assigned = label_grid >= 0
+    grid_positions = (np.argwhere(assigned) + 1).tolist()
+    grid_boxes = label_boxes[label_grid[assigned]].tolist()
+
     # Draw all detected labels in blue
-    for label in labels:
-        x1 = int(label['x'] * scale)
-        y1 = int(label['y'] * scale)
-        x2 = int((label['x'] + label['w']) * scale)
-        y2 = int((label['y'] + label['h']) * scale)
+    for x1, y1, x2, y2 in label_boxes.tolist():
         cv2.rectangle(debug_img, (x1, y1), (x2, y2), (255, 0, 0), 2)
 
     # Draw grid-assigned labels in green with their grid position
-    for (row, col), label in grid_labels.items():
-        x1 = int(label['x'] * scale)
-        y1 = int(label['y'] * scale)
-        x2 = int((label['x'] + label['w']) * scale)
-        y2 = int((label['y'] + label['h']) * scale)
+    for (row, col), (x1, y1, x2, y2) in zip(grid_positions, grid_boxes):
         cv2.rectangle(debug_img, (x1, y1), (x2, y2), (0, 255, 0), 2)
 
         # Add grid position text
@@ -546,57 +879,136 @@ def save_debug_image(img, labels, grid_labels, grid_info, output_path="debug_det
         cv2.putText(debug_img, text, (x1, y1 - 5),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 0), 1)
 
-    # Draw grid lines using the provided grid_info
+    # Draw individual drawer boundaries (drawers can span several grid
+    # units), scaling all coordinates for the debug image at once
     if grid_info:
-        if 'drawer_boundaries' in grid_info:
-            # Draw individual drawer boundaries for variable-sized drawers
-            drawer_boundaries = grid_info['drawer_boundaries']
-            for (row, col), bounds in drawer_boundaries.items():
-                # Scale coordinates for debug image
-                left = int(bounds['left'] * scale)
-                right = int(bounds['right'] * scale)
-                top = int(bounds['top'] * scale)
-                bottom = int(bounds['bottom'] * scale)
-
-                # Draw rectangle for this drawer
-                cv2.rectangle(debug_img, (left, top), (right, bottom), (0, 0, 255), 1)
-        else:
-            # Fallback to uniform grid for backward compatibility
-            grid_left = grid_info['left']
-            grid_right = grid_info['right']
-            grid_top = grid_info['top']
-            grid_bottom = grid_info['bottom']
-            cell_width = grid_info['cell_width']
-            cell_height = grid_info['cell_height']
-            grid_cols = grid_info['columns']
-            grid_rows = grid_info['rows']
-
-            # Draw vertical grid lines
-            for i in range(grid_cols + 1):
-                x = int((grid_left + i * cell_width) * scale)
-                cv2.line(
-                    debug_img,
-                    (x, int(grid_top * scale)),
-                    (x, int(grid_bottom * scale)),
-                    (0, 0, 255),
-                    1,
-                )
-
-            # Draw horizontal grid lines
-            for i in range(grid_rows + 1):
-                y = int((grid_top + i * cell_height) * scale)
-                cv2.line(
-                    debug_img,
-                    (int(grid_left * scale), y),
-                    (int(grid_right * scale), y),
-                    (0, 0, 255),
-                    1,
-                )
-
-    cv2.imwrite(str(output_path), debug_img)
+        drawer_bounds = (grid_info['drawer_bounds'] * scale).astype(np.int32).tolist()
+        for left, top, right, bottom in drawer_bounds:
+            cv2.rectangle(debug_img, (left, top), (right, bottom), (0, 0, 255), 1)
+
+    # JPEG encodes much faster than PNG and is plenty for an overview image
+    cv2.imwrite(str(output_path), debug_img, [cv2.IMWRITE_JPEG_QUALITY, 85])
     print(f"Saved debug image to {output_path}")
 
 
+def choose_decode_factor(image_path, max_side):
+    """
+    Pick the largest JPEG decode reduction (1, 2, 4 or 8) that keeps the
+    longest image side at or above max_side.
+
+    Only the image header is read (via Pillow); if that fails the image is
+    decoded at full resolution.
+    """
+    from PIL import Image
+
+    try:
+        with Image.open(image_path) as im:
+            long_side = max(im.size)
+    except OSError:
+        return 1
+
+    factor = 1
+    while factor < 8 and long_side // (factor * 2) >= max_side:
+        factor *= 2
+    return factor
+
+
+def detect_labels(image_path, output_dir, debug=False, max_side=DEFAULT_MAX_SIDE, verbose=False):
+    """
+    Load an image, rectify it using the ArUco markers and find the white labels.
+
+    Large images are decoded at a reduced size (see choose_decode_factor),
+    which libjpeg does nearly for free and which every later pass benefits
+    from. Pass max_side=None to decode at full resolution.
+
+    Exits with an error if the image can't be loaded or the markers aren't found.
+
+    Returns:
+        tuple: (rectified_image, case_bounds, labels)
+    """
+    import cv2
+
+    # Load image
+    factor = choose_decode_factor(image_path, max_side) if max_side else 1
+    flags = {
+        1: cv2.IMREAD_COLOR,
+        2: cv2.IMREAD_REDUCED_COLOR_2,
+        4: cv2.IMREAD_REDUCED_COLOR_4,
+        8: cv2.IMREAD_REDUCED_COLOR_8,
+    }[factor]
+    img = cv2.imread(str(image_path), flags)
+    scale = 1.0 / factor
+    if img is None:
+        print(f"Error: Could not load {image_path}")
+        sys.exit(1)
+
+    height, width = img.shape[:2]
+    print(f"Image size: {width} x {height} (loaded at {scale:g}x)")
+
+    # Step 1: Detect all four ArUco markers
+    print("\n--- Detecting ArUco markers ---")
+    corners = find_aruco_markers(img, verbose=verbose)
+    if corners is None:
+        print("Error: Could not detect all ArUco markers.")
+        print("Ensure markers ID 1 (TL), ID 2 (BR), ID 3 (TR), and ID 4 (BL) are visible.")
+        sys.exit(1)
+
+    # Step 2: Apply perspective transform to rectify the image
+    print("\n--- Applying perspective correction ---")
+    img_rectified, case_bounds = perspective_transform(img, corners)
+
+    # Save the rectified image for debugging
+    if debug:
+        cv2.imwrite(str(output_dir / "rectified.png"), img_rectified)
+        print(f"Saved rectified image to {output_dir / 'rectified.png'}")
+
+    # Step 3: Find white labels in the rectified image
+    print("\n--- Finding white labels ---")
+    labels = find_white_labels(img_rectified, output_dir, debug=debug, scale=scale)
+
+    return img_rectified, case_bounds, labels
+
+
+def load_detection_cache(cache_path, cache_key):
+    """
+    Load cached detections saved by save_detection_cache.
+
+    Returns:
+        tuple: (rectified_image, case_bounds, labels), or None if there is no
+        cache or it was made for a different version of the image
+    """
+    import numpy as np
+
+    try:
+        with np.load(cache_path) as data:
+            if tuple(data['key'].tolist()) != cache_key:
+                return None
+            labels = {
+                name[len('label_'):]: data[name]
+                for name in data.files if name.startswith('label_')
+            }
+            return data['rectified'], tuple(data['case_bounds'].tolist()), labels
+    except (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile):
+        return None
+
+
+def save_detection_cache(cache_path, cache_key, img_rectified, case_bounds, labels):
+    """Save the rectified image, case bounds and labels keyed by input mtime/size/resolution."""
+    import numpy as np
+
+    try:
+        np.savez(
+            cache_path,
+            key=np.array(cache_key, dtype=np.int64),
+            rectified=img_rectified,
+            case_bounds=np.array(case_bounds),
+            **{f'label_{name}': values for name, values in labels.items()},
+        )
+        print(f"Saved detection cache to {cache_path}")
+    except OSError as e:
+        print(f"Warning: Could not save detection cache: {e}")
+
+
 def parse_args():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(
@@ -631,15 +1043,61 @@ Examples:
         default=Path("."),
         help="Output directory for results (default: current directory)"
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore cached API responses and fetch them again"
+    )
+    parser.add_argument(
+        "--full-res",
+        action="store_true",
+        help="Process the image at full resolution (default: decode large images at reduced size)"
+    )
+    parser.add_argument(
+        "--max-side",
+        type=int,
+        default=DEFAULT_MAX_SIDE,
+        help=f"Smallest longest side to decode large images down to (default: {DEFAULT_MAX_SIDE})"
+    )
+    parser.add_argument(
+        "--cache-detections",
+        action="store_true",
+        help="Cache the rectified image and detected labels next to the input "
+             "(<image>.cache.npz) and reuse them while the image is unchanged"
+    )
+    parser.add_argument(
+        "--debug",
+        action="store_true",
+        help="Write intermediate debug images to the output directory"
+    )
+    parser.add_argument(
+        "--verbose", "-v",
+        action="store_true",
+        help="Print per-marker detection details"
+    )
     return parser.parse_args()
 
 
 def main():
     args = parse_args()
 
+    if OCR_BACKEND not in ("ollama", "tesseract"):
+        print(f"Error: Unknown OCR_BACKEND '{OCR_BACKEND}' (expected 'ollama' or 'tesseract')")
+        sys.exit(1)
+    if OCR_BACKEND == "tesseract":
+        try:
+            import tesserocr
+        except ImportError:
+            print("Error: OCR_BACKEND=tesseract requires the tesserocr package (the 'tesseract' extra)")
+            sys.exit(1)
+        tessdata_path, languages = tesserocr.get_languages()
+        if TESSERACT_LANG not in languages:
+            print(f"Error: Tesseract language '{TESSERACT_LANG}' not found in {tessdata_path}")
+            sys.exit(1)
+
     # Fetch layout templates from API
     print(f"Fetching layout templates from {args.api_url}...")
-    templates = fetch_layout_templates(args.api_url)
+    templates = fetch_layout_templates(args.api_url, use_cache=not args.no_cache)
     if templates is None:
         print("Error: Could not fetch layout templates from API")
         sys.exit(1)
@@ -671,68 +1129,92 @@ def main():
     print("=" * 50)
     print(f"Layout: {layout['name']} ({layout['columns']}x{layout['rows']})")
 
-    # Load image
-    img = cv2.imread(str(args.image))
-    if img is None:
-        print(f"Error: Could not load {args.image}")
-        sys.exit(1)
-
-    height, width = img.shape[:2]
-    print(f"Image size: {width} x {height}")
-
     output_dir = args.output_dir
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    # Step 1: Detect all four ArUco markers
-    print("\n--- Detecting ArUco markers ---")
-    corners = find_aruco_markers(img)
-    if corners is None:
-        print("Error: Could not detect all ArUco markers.")
-        print("Ensure markers ID 1 (TL), ID 2 (BR), ID 3 (TR), and ID 4 (BL) are visible.")
-        sys.exit(1)
-
-    # Step 2: Apply perspective transform to rectify the image
-    print("\n--- Applying perspective correction ---")
-    img_rectified, case_bounds = perspective_transform(img, corners)
-
-    # Save the rectified image for debugging
-    cv2.imwrite(str(output_dir / "rectified.png"), img_rectified)
-    print(f"Saved rectified image to {output_dir / 'rectified.png'}")
-
-    # Step 3: Find white labels in the rectified image
-    print("\n--- Finding white labels ---")
-    labels = find_white_labels(img_rectified, output_dir)
+    max_side = None if args.full_res else args.max_side
+
+    # Reuse the rectified image and labels from an earlier run if requested
+    detections = None
+    if args.cache_detections:
+        cache_path = args.image.with_name(f"{args.image.name}.cache.npz")
+        try:
+            stat = args.image.stat()
+            cache_key = (stat.st_mtime_ns, stat.st_size, max_side or 0)
+            detections = load_detection_cache(cache_path, cache_key)
+        except OSError:
+            cache_key = None
+
+    if detections is not None:
+        print(f"\nUsing cached detections from {cache_path}")
+        img_rectified, case_bounds, labels = detections
+    else:
+        img_rectified, case_bounds, labels = detect_labels(
+            args.image, output_dir, args.debug, max_side, args.verbose
+        )
+        if args.cache_detections and cache_key is not None:
+            save_detection_cache(cache_path, cache_key, img_rectified, case_bounds, labels)
 
     # Step 4: Assign labels to grid positions using case bounds and layout
     print("\n--- Assigning labels to grid ---")
     # Fetch drawer sizes to handle variable-sized drawers
-    drawer_sizes = fetch_drawer_sizes(args.api_url)
-    grid_labels, grid_info = assign_labels_to_grid(
+    drawer_sizes = fetch_drawer_sizes(args.api_url, use_cache=not args.no_cache)
+    label_grid, grid_info = assign_labels_to_grid(
         labels, case_bounds, layout, drawer_sizes
     )
 
-    print(f"Assigned {len(grid_labels)} labels to grid positions")
+    print(f"Assigned {(label_grid >= 0).sum()} labels to grid positions")
 
     # Save debug visualization (using rectified image)
-    save_debug_image(img_rectified, labels, grid_labels, grid_info, output_dir / "debug_detection.png")
+    if args.debug:
+        save_debug_image(img_rectified, labels, label_grid, grid_info, output_dir / "debug_detection.jpg")
 
-    # Debug: print assigned positions
-    for key in sorted(grid_labels.keys()):
-        label = grid_labels[key]
-        print(f"  Grid ({key[0]}, {key[1]}): label at ({label['x']}, {label['y']})")
+    # Debug: print assigned positions (nonzero walks them in row-major order)
+    for row, col in zip(*(label_grid >= 0).nonzero()):
+        i = label_grid[row, col]
+        print(f"  Grid ({row + 1}, {col + 1}): label at ({labels['x'][i]}, {labels['y'][i]})")
 
     # Step 5: Extract and OCR each label based on layout positions
     print("\n--- Running OCR on labels ---")
     results = []
     layout_data = layout.get('layoutData', [])
 
+    # Crop the labels up front (cheap slicing), then run the OCR requests,
+    # which are independent, concurrently against the backend
+    # Drawers outside the grid were skipped (with a warning) when assigning
+    # labels, so they are reported as having no label
+    grid_rows, grid_cols = label_grid.shape
+    label_images = {}
+    for drawer in layout_data:
+        row = drawer['row']
+        col = drawer['col']
+        if not (1 <= row <= grid_rows and 1 <= col <= grid_cols):
+            continue
+        i = label_grid[row - 1, col - 1]
+        if i >= 0:
+            label_images[(row, col)] = extract_label(
+                img_rectified, labels, i, row, col, output_dir, debug=args.debug
+            )
+    ocr_text = {}
+    # Tesseract is CPU-bound (and releases the GIL), so use one thread per
+    # core; Ollama requests mostly wait on the server
+    default_workers = (os.cpu_count() or 1) if OCR_BACKEND == "tesseract" else 8
+    max_workers = int(os.getenv("OCR_CONCURRENCY", default_workers))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(ocr_label, label_img): key
+            for key, label_img in label_images.items()
+        }
+        for future in as_completed(futures):
+            ocr_text[futures[future]] = future.result()
+
     for drawer in layout_data:
         row = drawer['row']
         col = drawer['col']
         key = (row, col)
 
-        if key in grid_labels:
-            text = extract_and_ocr_label(img_rectified, grid_labels[key], row, col, output_dir)
+        if key in ocr_text:
+            text = ocr_text[key]
             print(f"Row {row}, Col {col}: '{text}'")
         else:
             text = ""
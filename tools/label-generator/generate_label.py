@@ -20,6 +20,8 @@ Detection code example:
     corners, ids, rejected = detector.detectMarkers(image)
 """
 
+import functools
+
 import cv2
 import numpy as np
 from pathlib import Path
@@ -43,18 +45,19 @@ MARKER_ID_BR = 2
 MARKER_ID_TR = 3
 MARKER_ID_BL = 4
 
-# Generate ArUco markers
-aruco_dict = cv2.aruco.getPredefinedDictionary(ARUCO_DICT)
-marker_tl = cv2.aruco.generateImageMarker(aruco_dict, MARKER_ID_TL, MARKER_SIZE)
-marker_br = cv2.aruco.generateImageMarker(aruco_dict, MARKER_ID_BR, MARKER_SIZE)
-marker_tr = cv2.aruco.generateImageMarker(aruco_dict, MARKER_ID_TR, MARKER_SIZE)
-marker_bl = cv2.aruco.generateImageMarker(aruco_dict, MARKER_ID_BL, MARKER_SIZE)
 
-# Convert markers to PIL images
-marker_tl_pil = Image.fromarray(marker_tl).convert('RGB')
-marker_br_pil = Image.fromarray(marker_br).convert('RGB')
-marker_tr_pil = Image.fromarray(marker_tr).convert('RGB')
-marker_bl_pil = Image.fromarray(marker_bl).convert('RGB')
+@functools.lru_cache(maxsize=1)
+def aruco_dictionary():
+    """Look up the ArUco dictionary (once)."""
+    return cv2.aruco.getPredefinedDictionary(ARUCO_DICT)
+
+
+@functools.lru_cache(maxsize=None)
+def marker_image(marker_id):
+    """Render an ArUco marker as a grayscale PIL image (once per marker ID)."""
+    marker = cv2.aruco.generateImageMarker(aruco_dictionary(), marker_id, MARKER_SIZE)
+    return Image.fromarray(marker)  # 8-bit single channel -> mode 'L'
+
 
 # Try to load a nice font, fall back to default
 try:
@@ -66,88 +69,42 @@ except:
 
 margin = 15
 
-# === TL Label ===
-label_tl = Image.new('RGB', (WIDTH_PX, HEIGHT_PX), 'white')
-draw_tl = ImageDraw.Draw(label_tl)
-
-# Text "TL" in top-left
-draw_tl.text((margin, margin), "TL", fill='black', font=font_large)
-
-# Marker in bottom-right, vertically centered
-marker_x = WIDTH_PX - MARKER_SIZE - margin
-marker_y = (HEIGHT_PX - MARKER_SIZE) // 2
-label_tl.paste(marker_tl_pil, (marker_x, marker_y))
-
-# Add small ID label to the left of marker
-draw_tl.text((marker_x - 40, marker_y + MARKER_SIZE // 2), f"ID:{MARKER_ID_TL}", fill='gray', font=font_small)
-
-# Save TL label
-label_tl.save(SCRIPT_DIR / "label_TL.png", dpi=(DPI, DPI))
-
-# === BR Label ===
-label_br = Image.new('RGB', (WIDTH_PX, HEIGHT_PX), 'white')
-draw_br = ImageDraw.Draw(label_br)
-
-# Marker in top-left, vertically centered
-marker_x = margin
-marker_y = (HEIGHT_PX - MARKER_SIZE) // 2
-label_br.paste(marker_br_pil, (marker_x, marker_y))
-
-# Add small ID label to the right of marker
-draw_br.text((marker_x + MARKER_SIZE + 5, marker_y + MARKER_SIZE // 2), f"ID:{MARKER_ID_BR}", fill='gray', font=font_small)
-
-# Text "BR" in bottom-right
-br_bbox = draw_br.textbbox((0, 0), "BR", font=font_large)
-br_text_width = br_bbox[2] - br_bbox[0]
-br_text_height = br_bbox[3] - br_bbox[1]
-text_x = WIDTH_PX - br_text_width - margin
-text_y = HEIGHT_PX - br_text_height - margin - 10
-draw_br.text((text_x, text_y), "BR", fill='black', font=font_large)
-
-# Save BR label
-label_br.save(SCRIPT_DIR / "label_BR.png", dpi=(DPI, DPI))
-
-# === TR Label ===
-label_tr = Image.new('RGB', (WIDTH_PX, HEIGHT_PX), 'white')
-draw_tr = ImageDraw.Draw(label_tr)
-
-# Text "TR" in top-right
-tr_bbox = draw_tr.textbbox((0, 0), "TR", font=font_large)
-tr_text_width = tr_bbox[2] - tr_bbox[0]
-text_x = WIDTH_PX - tr_text_width - margin
-draw_tr.text((text_x, margin), "TR", fill='black', font=font_large)
-
-# Marker in bottom-left, vertically centered
-marker_x = margin
-marker_y = (HEIGHT_PX - MARKER_SIZE) // 2
-label_tr.paste(marker_tr_pil, (marker_x, marker_y))
-
-# Add small ID label to the right of marker
-draw_tr.text((marker_x + MARKER_SIZE + 5, marker_y + MARKER_SIZE // 2), f"ID:{MARKER_ID_TR}", fill='gray', font=font_small)
-
-# Save TR label
-label_tr.save(SCRIPT_DIR / "label_TR.png", dpi=(DPI, DPI))
-
-# === BL Label ===
-label_bl = Image.new('RGB', (WIDTH_PX, HEIGHT_PX), 'white')
-draw_bl = ImageDraw.Draw(label_bl)
-
-# Text "BL" in bottom-left
-bl_bbox = draw_bl.textbbox((0, 0), "BL", font=font_large)
-bl_text_height = bl_bbox[3] - bl_bbox[1]
-text_y = HEIGHT_PX - bl_text_height - margin - 10
-draw_bl.text((margin, text_y), "BL", fill='black', font=font_large)
-
-# Marker in top-right, vertically centered
-marker_x = WIDTH_PX - MARKER_SIZE - margin
-marker_y = (HEIGHT_PX - MARKER_SIZE) // 2
-label_bl.paste(marker_bl_pil, (marker_x, marker_y))
-
-# Add small ID label to the left of marker
-draw_bl.text((marker_x - 40, marker_y + MARKER_SIZE // 2), f"ID:{MARKER_ID_BL}", fill='gray', font=font_small)
 
-# Save BL label
-label_bl.save(SCRIPT_DIR / "label_BL.png", dpi=(DPI, DPI))
+def build_label(name, marker_id, marker_on_right, text_at_top):
+    """
+    Compose and save one corner label.
+
+    The marker is vertically centered against the left or right edge, with
+    its ID printed beside it; the corner name goes in the opposite top or
+    bottom corner.
+    """
+    label = Image.new('L', (WIDTH_PX, HEIGHT_PX), 'white')
+    draw = ImageDraw.Draw(label)
+
+    # Marker vertically centered, with a small ID label on its inner side
+    marker_y = (HEIGHT_PX - MARKER_SIZE) // 2
+    if marker_on_right:
+        marker_x = WIDTH_PX - MARKER_SIZE - margin
+        id_x = marker_x - 40
+    else:
+        marker_x = margin
+        id_x = marker_x + MARKER_SIZE + 5
+    label.paste(marker_image(marker_id), (marker_x, marker_y))
+    draw.text((id_x, marker_y + MARKER_SIZE // 2), f"ID:{marker_id}", fill='gray', font=font_small)
+
+    # Corner name on the side away from the marker
+    bbox = draw.textbbox((0, 0), name, font=font_large)
+    text_x = margin if marker_on_right else WIDTH_PX - (bbox[2] - bbox[0]) - margin
+    text_y = margin if text_at_top else HEIGHT_PX - (bbox[3] - bbox[1]) - margin - 10
+    draw.text((text_x, text_y), name, fill='black', font=font_large)
+
+    label.save(SCRIPT_DIR / f"label_{name}.png", dpi=(DPI, DPI))
+
+
+build_label("TL", MARKER_ID_TL, marker_on_right=True, text_at_top=True)
+build_label("BR", MARKER_ID_BR, marker_on_right=False, text_at_top=False)
+build_label("TR", MARKER_ID_TR, marker_on_right=False, text_at_top=True)
+build_label("BL", MARKER_ID_BL, marker_on_right=True, text_at_top=False)
 
 print("Labels created:")
 print(f"  - {SCRIPT_DIR / 'label_TL.png'}")